@@ -1,2 +1 @@
 from .advancedsurvey import AdvancedSurveyXBlock
-from .filters import *
\ No newline at end of file
@@ -1,33 +1,61 @@
-import pkg_resources
+from importlib import resources
 from web_fragments.fragment import Fragment
 from xblock.core import XBlock
-from xblock.fields import Scope, List, Dict, Integer, String
-from xblockutils.resources import ResourceLoader
-from xblockutils.settings import XBlockWithSettingsMixin
+from xblock.fields import Scope, List, Dict, Float, Integer, String
 from xblockutils.publish_event import PublishEventMixin
 from xblock.completable import XBlockCompletionMode
+from .results import RateColumn, SurveyResultSet, proportion_interval, reservoir_sample
 from .utils import DummyTranslationService, _
-from django import utils
-import six
 import time
 import json
+import random
 
-try:
-    # pylint: disable=import-error, bad-option-value, ungrouped-imports
-    from django.conf import settings
-    from api_manager.models import GroupProfile
-    HAS_GROUP_PROFILE = True
-except ImportError:
-    HAS_GROUP_PROFILE = False
+# Django, markdown, bleach and pkg_resources (pulled in by xblockutils.resources and
+# xblockutils.settings) are imported where they are used, so registering the entry point stays cheap.
 
-class ResourceMixin(XBlockWithSettingsMixin):
-    loader = ResourceLoader(__name__)
+
+def _get_group_profile_model():
+    """ Returns the GroupProfile model if the api_manager app is installed, otherwise None. """
+    try:
+        # pylint: disable=import-error, bad-option-value, ungrouped-imports
+        from api_manager.models import GroupProfile
+    except ImportError:
+        return None
+    return GroupProfile
+
+
+def _get_student_module_model():
+    """ Returns the LMS StudentModule model. """
+    try:
+        from lms.djangoapps.courseware.models import StudentModule  # pylint: disable=import-error
+    except RuntimeError:
+        from courseware.models import StudentModule
+    return StudentModule
+
+
+class ResourceMixin(object):
+
+    def get_xblock_settings(self, default=None):
+        """
+        Gets XBlock-specific settings for the current XBlock, or default if the settings service is unavailable.
+
+        Same as xblockutils' XBlockWithSettingsMixin, which can't be used as a base class
+        without importing django and pkg_resources along with it.
+        """
+        settings_service = self.runtime.service(self, "settings")
+        if settings_service:
+            return settings_service.get_settings_bucket(self, default=default)
+        return default
+
+    @property
+    def loader(self):
+        from xblockutils.resources import ResourceLoader
+        return ResourceLoader(__name__)
 
     @staticmethod
     def resource_string(path):
         """Handy helper for getting resources from our kit."""
-        data = pkg_resources.resource_string(__name__, path)
-        return data.decode("utf8")
+        return resources.files(__package__).joinpath(path).read_text(encoding="utf8")
 
     @property
     def i18n_service(self):
@@ -35,6 +63,7 @@ class ResourceMixin(XBlockWithSettingsMixin):
         return self.runtime.service(self, "i18n") or DummyTranslationService()
 
     def get_translation_content(self):
+        from django import utils
         try:
             return self.resource_string('public/js/translations/{lang}/textjs.js'.format(
                 lang=utils.translation.to_locale(utils.translation.get_language()),
@@ -43,6 +72,8 @@ class ResourceMixin(XBlockWithSettingsMixin):
             return self.resource_string('public/js/translations/en/textjs.js')
 
     def create_fragment(self, context, template, css, js, js_init):
+        # Importing the filters registers them with Django's template engine.
+        from . import filters  # pylint: disable=unused-import
         frag = Fragment()
         frag.add_content(self.loader.render_django_template(
             template,
@@ -68,7 +99,7 @@ class ResourceMixin(XBlockWithSettingsMixin):
         if hasattr(self, 'location'):
             return self.location.html_id()  # pylint: disable=no-member
 
-        return six.text_type(self.scope_ids.usage_id)
+        return str(self.scope_ids.usage_id)
 
 class CSVExportMixin(object):
     """
@@ -81,6 +112,11 @@ class CSVExportMixin(object):
         default="",
         scope=Scope.user_state_summary,
     )
+    active_export_started_at = Float(
+        # When the export in active_export_task_id was enqueued
+        default=0.0,
+        scope=Scope.user_state_summary,
+    )
     last_export_result = Dict(
         # The info dict returned by the most recent successful export.
         # If the export failed, it will have an "error" key set.
@@ -94,15 +130,26 @@ class CSVExportMixin(object):
         Asynchronously export given data as a CSV file.
         """
         # Launch task
-        from .tasks import export_csv_data  # Import here since this is edX LMS specific
+        # Import here since this is edX LMS specific
+        from .tasks import CHECKPOINT_STALE_AFTER_S, checkpoint_updated_at, export_csv_data
+
+        block_id = str(getattr(self.scope_ids, 'usage_id', None))
+        course_id = str(getattr(self.runtime, 'course_id', 'course_id'))
+
+        # Don't start a second run while one is pending: both would compete for the same checkpoint.
+        # Finished and failed exports are cleared from active_export_task_id here. A pending export
+        # whose checkpoint went stale was lost (e.g. its worker was killed), and is resumed by a new run.
+        self.check_pending_export()
+        if self.active_export_task_id:
+            last_activity = max(self.active_export_started_at, checkpoint_updated_at(block_id, course_id) or 0)
+            if time.time() - last_activity < CHECKPOINT_STALE_AFTER_S:
+                return self._get_export_status()
 
         # Make sure we nail down our state before sending off an asynchronous task.
-        async_result = export_csv_data.delay(
-            six.text_type(getattr(self.scope_ids, 'usage_id', None)),
-            six.text_type(getattr(self.runtime, 'course_id', 'course_id')),
-        )
+        async_result = export_csv_data.delay(block_id, course_id)
         if not async_result.ready():
             self.active_export_task_id = async_result.id
+            self.active_export_started_at = time.time()
         else:
             self._store_export_result(async_result)
 
@@ -117,9 +164,10 @@ class CSVExportMixin(object):
         return self._get_export_status()
 
     def _get_export_status(self):
-        self.check_pending_export()
+        progress = self.check_pending_export()
         return {
             'export_pending': bool(self.active_export_task_id),
+            'export_progress': progress,
             'last_export_result': self.last_export_result,
             'download_url': self.download_url_for_last_report,
         }
@@ -127,12 +175,16 @@ class CSVExportMixin(object):
     def check_pending_export(self):
         """
         If we're waiting for an export, see if it has finished, and if so, get the result.
+        Returns the export's last checkpoint info while it is still in progress.
         """
         from .tasks import export_csv_data  # Import here since this is edX LMS specific
         if self.active_export_task_id:
             async_result = export_csv_data.AsyncResult(self.active_export_task_id)
             if async_result.ready():
                 self._store_export_result(async_result)
+            elif async_result.state == 'PROGRESS':
+                return async_result.info
+        return None
 
     @property
     def download_url_for_last_report(self):
@@ -148,11 +200,7 @@ class CSVExportMixin(object):
         return dict(report_store.links_for(course_key)).get(self.last_export_result['report_filename'])
 
     def student_module_queryset(self):
-        try:
-            from lms.djangoapps.courseware.models import StudentModule  # pylint: disable=import-error
-        except RuntimeError:
-            from courseware.models import StudentModule
-        return StudentModule.objects.select_related('student').filter(
+        return _get_student_module_model().objects.select_related('student').filter(
             course_id=self.runtime.course_id,
             module_state_key=self.scope_ids.usage_id,
         ).order_by('-modified')
@@ -166,11 +214,23 @@ class CSVExportMixin(object):
             else:
                 self.last_export_result = {'error': u'Unexpected result: {}'.format(repr(task_result.result))}
         else:
-            self.last_export_result = {'error': six.text_type(task_result.result)}
+            self.last_export_result = {'error': str(task_result.result)}
 
     def prepare_data(self):
         """
-        Return a two-dimensional list containing cells of data ready for CSV export.
+        Return an iterable of rows containing cells of data ready for CSV export.
+        """
+        raise NotImplementedError
+
+    def export_header_row(self):
+        """
+        Return the header row of the CSV export.
+        """
+        raise NotImplementedError
+
+    def iter_export_batches(self, after_student_id=None, batch_size=None):
+        """
+        Yield ``(last_student_id, result_set)`` pairs covering the learners after ``after_student_id``.
         """
         raise NotImplementedError
 
@@ -191,6 +251,18 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
     has_custom_completion = True
     has_author_view = True
     event_namespace = 'xblock.advancedsurvey'
+
+    # Defaults for the sampled results preview, overridable through the XBlock settings
+    # (PREVIEW_SAMPLE_SIZE, PREVIEW_MAX_SCAN, PREVIEW_TIME_BUDGET_S).
+    preview_sample_size = 1000
+    preview_max_sample_size = 10000
+    preview_max_scan = 50000
+    preview_time_budget_s = 2.0
+    # Rows read per random window when the block has more learners than PREVIEW_MAX_SCAN.
+    preview_window_size = 100
+
+    # Number of learners exported between two checkpoints of a CSV export.
+    export_batch_size = 5000
     
     display_name = String(default=_('Advanced Survey'))
     block_name = String(default=_('Advanced Survey'))
@@ -225,6 +297,29 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
             event_dict,
         )
 
+    def send_batch_submit_event(self, blocks):
+        """
+        Let the LMS know the user has submitted several surveys: each block is marked as
+        completed as usual, and the answers are sent in one tracking event.
+        """
+        for block in blocks:
+            block.runtime.publish(block, 'completion', {'completion': 1.0})
+        # The SDK doesn't set url_name.
+        self.publish_event_from_dict(
+            self.event_namespace + '.batch_submitted',
+            {
+                'url_name': getattr(self, 'url_name', ''),
+                'submissions': [
+                    {
+                        'usage_id': str(block.scope_ids.usage_id),
+                        'url_name': getattr(block, 'url_name', ''),
+                        'answers': block.answers,
+                    }
+                    for block in blocks
+                ],
+            },
+        )
+
     def questions_to_json(self):
         return json.dumps(self.questions)
 
@@ -251,9 +346,11 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
 
         # Check if user is member of a group that is explicitly granted
         # permission to view the results through django configuration.
-        if not HAS_GROUP_PROFILE:
+        GroupProfile = _get_group_profile_model()
+        if GroupProfile is None:
             return False
 
+        from django.conf import settings
         group_names = getattr(settings, 'XBLOCK_ADVANCEDSURVEY_EXTRA_VIEW_GROUPS', [])
         if not group_names:
             return False
@@ -283,7 +380,8 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
             'questions': self.questions,
             'answers': self.answers,
             'block_id': self._get_block_id(),
-            'usage_id': six.text_type(self.scope_ids.usage_id),
+            'usage_id': str(self.scope_ids.usage_id),
+            'parent_id': str(self.parent) if self.parent else '',
             'can_submit': self.can_submit(),
             'can_view_results': self.can_view_results(),
             'block_name': self.block_name,
@@ -343,10 +441,10 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
         
         return self.answers
 
-    @XBlock.json_handler
-    def submit(self, data, suffix=''):
+    def validate_submission(self, data):
         """
-        Submit the user's answers
+        Check that the user may submit and has answered all required questions.
+        Returns ``(result, cleaned_answers)``, where ``cleaned_answers`` is None if the submission is rejected.
         """
         questions = list(self.questions)
         result = {'success': True, 'errors': []}
@@ -354,7 +452,7 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
         if answers:
             result['success'] = False
             result['errors'].append(self.ugettext("You have already answered this survey."))
-            return result
+            return result, None
 
         if not answers:
             # Reset submissions count if answers are bogus
@@ -363,7 +461,7 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
         if not self.can_submit():
             result['success'] = False
             result['errors'].append(self.ugettext('You have already answered this survey as many times as you are allowed to.'))
-            return result
+            return result, None
 
         # Make sure the user has included all questions
         all_answered = True
@@ -372,12 +470,13 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
             question_id = question['question_id']
             if question['type'] == 'rate':
                 for prompt in question['prompts']:
-                    answer = data.get(str(question_id), {}).get(str(prompt[0]), None)
+                    prompt_answers = data.get(str(question_id))
+                    answer = prompt_answers.get(str(prompt[0])) if isinstance(prompt_answers, dict) else None
                     if answer is None or answer == 'none':
                         all_answered = False
                         result['success'] = False
                         result['errors'].append(self.ugettext('You did not answer all required questions.'))
-                        return result
+                        return result, None
                     cleaned_answers[f"q-{question_id}-p-{prompt[0]}"] = answer
             elif question['type'] == 'free':
                 answer = data.get(str(question_id), None)
@@ -385,24 +484,122 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
                     all_answered = False
                     result['success'] = False
                     result['errors'].append(self.ugettext('You did not answer all required questions.'))
-                    return result
+                    return result, None
                 cleaned_answers[f"q-{question_id}"] = answer
     
         if not result['success']:
             result['can_submit'] = self.can_submit()
-            return result
+            return result, None
 
-        # Record the submission!
+        return result, cleaned_answers
+
+    def record_submission(self, cleaned_answers, result):
+        """
+        Store validated answers and add the submission details to ``result``.
+        """
         self.answers = cleaned_answers
 
         self.submissions_count += 1
-        self.send_submit_event({'answers': self.answers})
         result['can_submit'] = self.can_submit()
         result['submissions_count'] = self.submissions_count
         result['max_submissions'] = self.max_submissions
 
+    @XBlock.json_handler
+    def submit(self, data, suffix=''):
+        """
+        Submit the user's answers
+        """
+        result, cleaned_answers = self.validate_submission(data)
+        if cleaned_answers is None:
+            return result
+
+        # Record the submission!
+        self.record_submission(cleaned_answers, result)
+        self.send_submit_event({'answers': self.answers})
+
         return result
 
+    def get_sibling_surveys(self, usage_ids):
+        """
+        Returns the advancedsurvey blocks among ``usage_ids`` that share this block's parent, keyed by usage id.
+
+        Siblings are loaded through the parent's ``get_children``, so the runtime's access checks apply.
+        """
+        usage_ids = set(usage_ids)
+        own_usage_id = str(self.scope_ids.usage_id)
+        blocks = {own_usage_id: self} if own_usage_id in usage_ids else {}
+
+        parent = self.get_parent()
+        if parent is None:
+            return blocks
+        sibling_ids = usage_ids - set(blocks)
+        for block in parent.get_children(usage_id_filter=lambda usage_id: str(usage_id) in sibling_ids):
+            # The LMS returns None for children the user can't access.
+            if isinstance(block, AdvancedSurveyXBlock):
+                blocks[str(block.scope_ids.usage_id)] = block
+        return blocks
+
+    def load_submission_state(self, blocks):
+        """
+        Load the stored answers and submission counts of sibling blocks from the database.
+
+        A handler request may only prefetch the user state of the block handling it, and siblings
+        would otherwise see the default values, letting the learner submit them again.
+        """
+        siblings = [block for block in blocks if block is not self]
+        if not siblings:
+            return
+        stored_states = dict(
+            (str(usage_id), state)
+            for usage_id, state in _get_student_module_model().objects.filter(
+                student_id=self.scope_ids.user_id,
+                course_id=self.runtime.course_id,
+                module_state_key__in=[block.scope_ids.usage_id for block in siblings],
+            ).values_list('module_state_key', 'state')
+        )
+        for block in siblings:
+            state = json.loads(stored_states.get(str(block.scope_ids.usage_id)) or '{}')
+            for field_name in ('answers', 'submissions_count'):
+                if field_name in state:
+                    setattr(block, field_name, state[field_name])
+
+    @XBlock.json_handler
+    def batch_submit(self, data, suffix=''):
+        """
+        Submit the user's answers to several advancedsurvey blocks of the same vertical in one request.
+
+        ``data['blocks']`` maps each block's usage id to the answers its ``submit`` handler would receive.
+        Nothing is recorded unless the answers to every block are valid.
+        """
+        blocks_data = data.get('blocks') if isinstance(data, dict) else None
+        if not isinstance(blocks_data, dict) or not all(isinstance(value, dict) for value in blocks_data.values()):
+            return {'success': False, 'errors': [self.ugettext('Invalid submission.')], 'results': {}}
+
+        surveys = self.get_sibling_surveys(blocks_data)
+        self.load_submission_state(surveys.values())
+        results = {}
+        validated = []
+        for usage_id, block_data in blocks_data.items():
+            block = surveys.get(usage_id)
+            if block is None:
+                results[usage_id] = {'success': False, 'errors': [self.ugettext('This survey could not be found.')]}
+                continue
+            result, cleaned_answers = block.validate_submission(block_data)
+            results[usage_id] = result
+            if cleaned_answers is not None:
+                validated.append((block, cleaned_answers, result))
+
+        success = bool(blocks_data) and len(validated) == len(blocks_data)
+        if success:
+            for block, cleaned_answers, result in validated:
+                block.record_submission(cleaned_answers, result)
+                if block is not self:
+                    # The runtime only saves the block handling the request.
+                    block.save()
+            self.send_batch_submit_event([block for block, _, _ in validated])
+
+        return {'success': success, 'results': results}
+
     @XBlock.json_handler
     def studio_submit(self, data, suffix=''):
         result = {'success': True, 'errors': []}
@@ -425,49 +622,147 @@ class AdvancedSurveyXBlock(XBlock, ResourceMixin, PublishEventMixin, CSVExportMi
 
         return result
 
+    def export_header_row(self):
+        return SurveyResultSet(self.questions).header_row()
+
+    def iter_export_batches(self, after_student_id=None, batch_size=None):
+        """
+        Yield ``(last_student_id, result_set)`` for consecutive batches of learners, ordered by student id.
+
+        Only learners after ``after_student_id`` are loaded, so an interrupted export can resume where it stopped.
+        """
+        batch_size = batch_size or self.export_batch_size
+        queryset = self.student_module_queryset().order_by('student_id')
+        while True:
+            if after_student_id is not None:
+                batch = list(queryset.filter(student_id__gt=after_student_id)[:batch_size])
+            else:
+                batch = list(queryset[:batch_size])
+            if not batch:
+                return
+
+            result_set = SurveyResultSet(self.questions)
+            for sm in batch:
+                answers = json.loads(sm.state).get('answers')
+                if answers:
+                    result_set.add(sm.student.id, sm.student.username, sm.student.email, answers)
+            after_student_id = batch[-1].student.id
+            yield after_student_id, result_set
+
     def prepare_data(self):
         """
-        Return a two-dimensional list containing cells of data ready for CSV export.
+        Return an iterable of rows, header first, containing cells of data ready for CSV export.
         """
-        header_row = ['user_id', 'username', 'user_email']
-        question_prefix = ""
-        for question in self.questions:
-            if 'header' in question:
-                question_prefix = f"{question['header']}: "
+        yield self.export_header_row()
+        for _last_student_id, result_set in self.iter_export_batches():
+            yield from result_set.iter_rows()
 
-            if question['type'] == 'rate':
-                for prompt in question['prompts']:
-                    header_row.append(f"{question_prefix}{prompt[1]}")
-            elif question['type'] == 'free':
-                header_row.append(f"{question_prefix}{question['prompt']}")
-
-        data = {}
-        for sm in self.student_module_queryset():
-            state = json.loads(sm.state)
-            if sm.student.id not in data and state.get('answers'):
-                row = [
-                    sm.student.id,
-                    sm.student.username,
-                    sm.student.email,
+    def iter_sampled_states(self, sample_size, max_scan):
+        """
+        Yields the states of up to ``sample_size`` distinct learners, read in windows of consecutive
+        rows that start at random ids. No more than ``max_scan`` rows are read.
+
+        Each window is a range scan on the primary key within the block's rows, so it stays cheap
+        however many learners the block has.
+        """
+        queryset = self.student_module_queryset().order_by()
+        first_ids = list(queryset.order_by('id').values_list('id', flat=True)[:1])
+        last_ids = list(queryset.order_by('-id').values_list('id', flat=True)[:1])
+        if not first_ids or not last_ids:
+            return
+
+        seen = set()
+        for _ in range(max(1, max_scan // self.preview_window_size)):
+            start_id = random.randint(first_ids[0], last_ids[0])
+            window = queryset.filter(id__gte=start_id).order_by('id').values_list('id', 'state')
+            for row_id, state in window[:self.preview_window_size].iterator():
+                if row_id in seen:
+                    continue
+                seen.add(row_id)
+                yield state
+                if len(seen) >= sample_size:
+                    return
+
+    def _get_preview_setting(self, preview_settings, name, default, cast):
+        try:
+            return cast(preview_settings.get(name, default))
+        except (TypeError, ValueError):
+            return default
+
+    @XBlock.json_handler
+    def preview_results(self, data, suffix=''):
+        """
+        Estimate option distributions and response counts from a random sample of learners' states.
+
+        Blocks with up to ``max_scan`` learners are scanned in full. Larger blocks are sampled from
+        random windows of rows, and the estimates are scaled to the block's number of learners.
+        """
+        if not self.can_view_results():
+            return {'success': False, 'errors': [self.ugettext('You do not have permission to view results.')]}
+
+        preview_settings = self.get_xblock_settings(default={}) or {}
+        sample_size = self._get_preview_setting(
+            data, 'sample_size',
+            self._get_preview_setting(preview_settings, 'PREVIEW_SAMPLE_SIZE', self.preview_sample_size, int),
+            int,
+        )
+        sample_size = max(1, min(sample_size, self.preview_max_sample_size))
+        max_scan = max(1, self._get_preview_setting(preview_settings, 'PREVIEW_MAX_SCAN', self.preview_max_scan, int))
+        time_budget = self._get_preview_setting(
+            preview_settings, 'PREVIEW_TIME_BUDGET_S', self.preview_time_budget_s, float
+        )
+
+        queryset = self.student_module_queryset().order_by()
+        population = queryset.count()
+        if population <= max_scan:
+            states = queryset.values_list('state', flat=True).iterator()
+        else:
+            states = self.iter_sampled_states(sample_size, max_scan)
+        sample, scanned, exhausted = reservoir_sample(states, sample_size, time_budget=time_budget)
+        complete = population <= max_scan and exhausted
+
+        result_set = SurveyResultSet(self.questions)
+        for state in sample:
+            answers = json.loads(state).get('answers')
+            if answers:
+                result_set.add(0, '', '', answers)
+
+        def estimate(count, total, scale_to):
+            low, high = proportion_interval(count, total)
+            return {
+                'count': count,
+                'proportion': count / total if total else 0.0,
+                'low': low,
+                'high': high,
+                'estimated_total': round(scale_to * count / total) if total else 0,
+            }
+
+        responses = estimate(len(result_set), len(sample), population)
+        prompts = []
+        for column in result_set.columns:
+            answered = column.answered_count()
+            prompt = {
+                'header': column.header,
+                'responses': estimate(answered, len(sample), population),
+            }
+            if isinstance(column, RateColumn):
+                prompt['options'] = [
+                    dict(estimate(count, answered, prompt['responses']['estimated_total']), label=label)
+                    for label, count in zip(column.labels, column.counts())
                 ]
-                for question in self.questions:
-                    answers = state.get('answers')
-                    question_key = f"q-{question['question_id']}"
-                    if question['type'] == 'rate':
-                        options_map = {}
-                        for option in question['options']:
-                            options_map[str(option[0])] = option[1]
-
-                        for prompt in question['prompts']:
-                            answer_id = f"{question_key}-p-{prompt[0]}"
-                            if answer_id in answers:
-                                option_id = answers[answer_id].split('-')[1]
-                                row.append(options_map[option_id])
-                    elif question['type'] == 'free':
-                        if question_key in answers:
-                            row.append(answers[question_key])
-                data[sm.student.id] = row
-        return header_row + list(data.values())
+            prompts.append(prompt)
+
+        return {
+            'success': True,
+            # True when every learner state of the block was scanned, not a random sample of them.
+            'complete': complete,
+            'exact': complete and scanned <= sample_size,
+            'sample_size': len(sample),
+            'scanned': scanned,
+            'population': population,
+            'responses': responses,
+            'prompts': prompts,
+        }
 
     def get_filename(self):
         """
@@ -0,0 +1,209 @@
+"""
+Load driver for the advancedsurvey XBlock, running against the local stand-ins.
+
+Simulates N learners submitting the surveys of a vertical and M staff members
+exporting and previewing results concurrently, then reports throughput and latency
+percentiles per handler. Run with::
+
+    python -m advancedsurvey.loadtest.driver --learners 1000 --staff 5 --concurrency 32
+
+With ``--blocks 4 --batch``, learners submit all four surveys through one ``batch_submit`` call.
+"""
+import argparse
+import functools
+import json
+import math
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from webob import Request
+from xblock.fields import ScopeIds
+
+from .standins import (
+    HandlerRequestKeyValueStore, LoadTestRuntime, PublishedEvents, StudentModuleDatabase, StudentModuleKeyValueStore,
+    VerticalBlock, install, uninstall,
+)
+
+COURSE_ID = 'course-v1:LoadTest+LT101+run'
+VERTICAL_ID = 'block-v1:LoadTest+LT101+run+type@vertical+block@unit'
+USAGE_ID = 'block-v1:LoadTest+LT101+run+type@advancedsurvey+block@survey{}'
+STAFF_HANDLERS = ('csv_export', 'get_export_status', 'preview_results')
+
+
+class LoadTest(object):
+    """
+    Sets up a vertical of survey blocks backed by the stand-ins and drives handler calls against them.
+
+    The stand-ins stay installed until close(), which ``with LoadTest(...) as load_test:`` calls on exit.
+    """
+    def __init__(self, database_path=None, report_root=None, blocks=1):
+        self.database = StudentModuleDatabase(database_path)
+        self.modulestore = install(self.database, report_root=report_root)
+
+        # Import after the stand-ins are installed
+        from opaque_keys.edx.keys import UsageKey  # pylint: disable=import-error
+        from ..advancedsurvey import AdvancedSurveyXBlock
+        self.usage_key = UsageKey.from_string
+        self.block_class = AdvancedSurveyXBlock
+
+        self.kvs = StudentModuleKeyValueStore(self.database, COURSE_ID)
+        # XBlock settings buckets by block class name, e.g. {'AdvancedSurveyXBlock': {'PREVIEW_MAX_SCAN': 1000}}.
+        self.xblock_settings = {}
+        self.published = PublishedEvents()
+        self.usage_ids = [USAGE_ID.format(index) for index in range(blocks)]
+        author_runtime = self.get_runtime(None, user_is_staff=True)
+        vertical = self.get_block(author_runtime, VERTICAL_ID, VerticalBlock, 'vertical')
+        vertical.children = [self.usage_key(usage_id) for usage_id in self.usage_ids]
+        vertical.save()
+        self.modulestore.add_item(vertical)
+        for usage_id in self.usage_ids:
+            block = self.get_block(author_runtime, usage_id)
+            block.parent = self.usage_key(VERTICAL_ID)
+            block.save()
+            self.modulestore.add_item(block)
+
+        self.latencies = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Uninstall the stand-ins, restoring the modules they replaced. """
+        uninstall()
+
+    def get_runtime(self, user_id, user_is_staff=False, handler_usage_id=None):
+        """
+        Returns a runtime for the user. With handler_usage_id, it only loads that block's user state,
+        like the LMS does for a handler request.
+        """
+        kvs = self.kvs if handler_usage_id is None else HandlerRequestKeyValueStore(self.kvs, [handler_usage_id])
+        return LoadTestRuntime(
+            kvs, COURSE_ID, self.modulestore, self.published,
+            user_id=user_id, user_is_staff=user_is_staff, xblock_settings=self.xblock_settings,
+        )
+
+    def get_block(self, runtime, usage_id, block_class=None, block_type='advancedsurvey'):
+        usage_key = self.usage_key(usage_id)
+        return runtime.construct_xblock_from_class(
+            block_class or self.block_class, ScopeIds(runtime.current_user_id, block_type, usage_key, usage_key)
+        )
+
+    def add_learners(self, count):
+        for user_id in range(1, count + 1):
+            self.database.add_user(user_id, f"learner{user_id}", f"learner{user_id}@example.com")
+        return list(range(1, count + 1))
+
+    def random_answers(self, block):
+        answers = {}
+        for question in block.questions:
+            if question['type'] == 'rate':
+                answers[str(question['question_id'])] = {
+                    str(prompt[0]): f"o-{random.choice(question['options'])[0]}" for prompt in question['prompts']
+                }
+            elif question['type'] == 'free':
+                answers[str(question['question_id'])] = "Load test answer"
+        return answers
+
+    def call(self, runtime, block, handler_name, data):
+        request = Request.blank('/', method='POST', body=json.dumps(data).encode('utf-8'))
+        start = time.perf_counter()
+        failed = False
+        try:
+            response = runtime.handle(block, handler_name, request)
+            failed = response.status_code != 200 or json.loads(response.body).get('success') is False
+        except Exception:  # pylint: disable=broad-except
+            failed = True
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies.setdefault(handler_name, []).append(elapsed)
+            if failed:
+                self.errors[handler_name] = self.errors.get(handler_name, 0) + 1
+
+    def learner_session(self, user_id, batch=False):
+        runtime = self.get_runtime(user_id, handler_usage_id=self.usage_ids[0] if batch else None)
+        blocks = [self.get_block(runtime, usage_id) for usage_id in self.usage_ids]
+        if batch:
+            self.call(runtime, blocks[0], 'batch_submit', {
+                'blocks': {usage_id: self.random_answers(block) for usage_id, block in zip(self.usage_ids, blocks)},
+            })
+        else:
+            for block in blocks:
+                self.call(runtime, block, 'submit', self.random_answers(block))
+
+    def staff_session(self, user_id):
+        runtime = self.get_runtime(user_id, user_is_staff=True)
+        for usage_id in self.usage_ids:
+            for handler_name in STAFF_HANDLERS:
+                self.call(runtime, self.get_block(runtime, usage_id), handler_name, {})
+
+    def run(self, learners, staff, concurrency, batch=False):
+        sessions = [
+            (functools.partial(self.learner_session, batch=batch), user_id) for user_id in self.add_learners(learners)
+        ]
+        sessions += [(self.staff_session, -user_id) for user_id in range(1, staff + 1)]
+        random.shuffle(sessions)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(session, user_id) for session, user_id in sessions]:
+                future.result()
+        return time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    """ Nearest-rank percentile of an already sorted list. """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def report(load_test, wall_time):
+    lines = [
+        f"{'handler':<20} {'calls':>7} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    ]
+    for handler_name, latencies in sorted(load_test.latencies.items()):
+        latencies = sorted(latencies)
+        lines.append("{:<20} {:>7} {:>7} {:>9.1f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+            handler_name,
+            len(latencies),
+            load_test.errors.get(handler_name, 0),
+            len(latencies) / wall_time,
+            percentile(latencies, 0.50) * 1000,
+            percentile(latencies, 0.95) * 1000,
+            percentile(latencies, 0.99) * 1000,
+        ))
+    total = sum(len(latencies) for latencies in load_test.latencies.values())
+    lines.append(f"total: {total} calls in {wall_time:.2f}s ({total / wall_time:.1f} req/s)")
+    lines.append(f"published events: {load_test.published.counts}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--learners', type=int, default=1000, help="Number of learners submitting the survey.")
+    parser.add_argument('--staff', type=int, default=5, help="Number of staff members exporting results.")
+    parser.add_argument('--blocks', type=int, default=1, help="Number of survey blocks in the vertical.")
+    parser.add_argument('--batch', action='store_true', help="Submit all blocks of the vertical with batch_submit.")
+    parser.add_argument('--concurrency', type=int, default=32, help="Number of concurrent workers.")
+    parser.add_argument('--database', default=None, help="SQLite database path for StudentModule rows (default: a temporary file).")
+    parser.add_argument('--report-root', default=None, help="Directory for exported reports.")
+    args = parser.parse_args(argv)
+
+    with LoadTest(
+        args.database, args.report_root or tempfile.mkdtemp(prefix='advancedsurvey-reports-'), args.blocks
+    ) as load_test:
+        wall_time = load_test.run(args.learners, args.staff, args.concurrency, args.batch)
+        print(report(load_test, wall_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,597 @@
+"""
+Local stand-ins for the Open edX services used by the advancedsurvey XBlock.
+
+``install()`` registers these under the module paths that ``tasks.py`` and the
+XBlock import from (``celery``, ``lms.djangoapps...`` and ``xmodule...``), so the
+block and its export task can run without an LMS.
+"""
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import types
+import uuid
+
+from xblock.core import XBlock
+from xblock.exceptions import NoSuchUsage
+from xblock.fields import Scope, ScopeIds
+from xblock.runtime import KeyValueStore, KvsFieldData, MemoryIdManager, Runtime
+
+from ..utils import DummyTranslationService, _
+
+
+class EagerResult(object):
+    """ Result of a task that already ran, mirroring celery's EagerResult. """
+    def __init__(self, task_id, result, successful):
+        self.id = task_id
+        self.result = result
+        self._successful = successful
+        self.state = 'SUCCESS' if successful else 'FAILURE'
+        self.info = result
+
+    def ready(self):
+        return True
+
+    def successful(self):
+        return self._successful
+
+
+class PendingResult(object):
+    """ What celery returns for a task id it knows nothing about. """
+    def __init__(self, task_id):
+        self.id = task_id
+        self.result = None
+        self.state = 'PENDING'
+        self.info = None
+
+    def ready(self):
+        return False
+
+    def successful(self):
+        return False
+
+
+class EagerTask(object):
+    """ A task that runs synchronously when it is queued. """
+    def __init__(self, fun, name, bind=False):
+        self.fun = fun
+        self.name = name
+        self.bind = bind
+        self.results = {}
+        self.request = threading.local()
+        self.progress = threading.local()
+
+    def __call__(self, *args, **kwargs):
+        if self.bind:
+            return self.fun(self, *args, **kwargs)
+        return self.fun(*args, **kwargs)
+
+    def update_state(self, state=None, meta=None):
+        self.progress.state = state
+        self.progress.meta = meta
+
+    def apply_async(self, args=(), kwargs=None, task_id=None):
+        task_id = task_id or str(uuid.uuid4())
+        self.request.id = task_id
+        try:
+            result = EagerResult(task_id, self(*args, **(kwargs or {})), True)
+        except Exception as exc:  # pylint: disable=broad-except
+            result = EagerResult(task_id, exc, False)
+        self.results[task_id] = result
+        return result
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+    def AsyncResult(self, task_id):  # pylint: disable=invalid-name
+        return self.results.get(task_id) or PendingResult(task_id)
+
+
+class EagerCelery(object):
+    """ Stand-in for ``celery.current_app`` that runs every task eagerly. """
+    def __init__(self):
+        self.tasks = {}
+
+    def task(self, name=None, **options):
+        def decorator(fun):
+            task = EagerTask(fun, name or fun.__name__, bind=options.get('bind', False))
+            self.tasks[task.name] = task
+            return task
+        return decorator
+
+
+class LocalStorage(object):
+    """ The subset of Django's Storage API used with report stores. """
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def open(self, path, mode='rb'):
+        return open(path, mode)  # pylint: disable=consider-using-with, unspecified-encoding
+
+    def delete(self, path):
+        os.remove(path)
+
+    def listdir(self, path):
+        entries = os.listdir(path)
+        return (
+            [entry for entry in entries if os.path.isdir(os.path.join(path, entry))],
+            [entry for entry in entries if os.path.isfile(os.path.join(path, entry))],
+        )
+
+
+class FilesystemReportStore(object):
+    """ Stand-in for the instructor task ReportStore, writing reports to a local directory. """
+    root = os.path.join(tempfile.gettempdir(), 'advancedsurvey-reports')
+
+    def __init__(self, root):
+        self.root = root
+        self.storage = LocalStorage()
+
+    @classmethod
+    def from_config(cls, config_name):
+        return cls(os.path.join(cls.root, config_name))
+
+    def path_to(self, course_id, filename=''):
+        return os.path.join(self.root, str(course_id).replace(':', '_').replace('/', '_'), filename)
+
+    def store(self, course_id, filename, buff):
+        os.makedirs(os.path.dirname(self.path_to(course_id, filename)), exist_ok=True)
+        with open(self.path_to(course_id, filename), 'wb') as report:
+            shutil.copyfileobj(buff, report)
+
+    def store_rows(self, course_id, filename, rows):
+        # Like the LMS report store, start the file with a UTF-8 byte order mark.
+        os.makedirs(os.path.dirname(self.path_to(course_id, filename)), exist_ok=True)
+        with open(self.path_to(course_id, filename), 'w', newline='', encoding='utf-8-sig') as report:
+            csv.writer(report).writerows(rows)
+
+    def links_for(self, course_id):
+        """ Every file (not subdirectory) in the course's directory, as the LMS lists them. """
+        if course_id is None or not os.path.isdir(self.path_to(course_id)):
+            return []
+        return [
+            (filename, 'file://' + self.path_to(course_id, filename))
+            for filename in sorted(os.listdir(self.path_to(course_id)))
+            if os.path.isfile(self.path_to(course_id, filename))
+        ]
+
+
+class InMemoryModulestore(object):
+    """ Stand-in for the modulestore, holding blocks by their usage key. """
+    def __init__(self):
+        self.items = {}
+
+    def add_item(self, block):
+        self.items[str(block.scope_ids.usage_id)] = block
+
+    def get_item(self, usage_key):
+        return self.items[str(usage_key)]
+
+
+class VerticalBlock(XBlock):
+    """ Stand-in for the LMS vertical (a unit) that holds the survey blocks. """
+    has_children = True
+
+
+class Student(object):
+    def __init__(self, user_id, username, email):
+        self.id = user_id
+        self.username = username
+        self.email = email
+
+
+class StudentModuleRow(object):
+    def __init__(self, row):
+        self.id, self.course_id, self.module_state_key, self.state, self.modified = row[:5]
+        self.student = Student(*row[5:])
+
+
+class StudentModuleQuerySet(object):
+    """
+    The subset of Django's QuerySet API used by the XBlock, backed by SQLite.
+    """
+    fields = {
+        'id': 'sm.id',
+        'student_id': 'sm.student_id',
+        'course_id': 'sm.course_id',
+        'module_state_key': 'sm.module_state_key',
+        'state': 'sm.state',
+        'modified': 'sm.modified',
+    }
+    lookups = {'': '=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+    def __init__(self, database, where=(), order=(), value_fields=(), flat=False, limit=None):
+        self.database = database
+        self.where = tuple(where)
+        self.order = tuple(order)
+        self.value_fields = tuple(value_fields)
+        self.flat = flat
+        self.limit = limit
+
+    def _clone(self, **changes):
+        values = dict(
+            where=self.where, order=self.order, value_fields=self.value_fields, flat=self.flat, limit=self.limit
+        )
+        values.update(changes)
+        return StudentModuleQuerySet(self.database, **values)
+
+    def select_related(self, *fields):
+        return self
+
+    def filter(self, **conditions):
+        where = list(self.where)
+        for lookup, value in conditions.items():
+            field, _, operator = lookup.partition('__')
+            if operator == 'in':
+                values = [self._param(item) for item in value]
+                where.append((f"{self.fields[field]} IN ({', '.join('?' * len(values))})", values))
+            else:
+                where.append((f"{self.fields[field]} {self.lookups[operator]} ?", [self._param(value)]))
+        return self._clone(where=where)
+
+    @staticmethod
+    def _param(value):
+        return value if isinstance(value, (int, float)) else str(value)
+
+    def order_by(self, *fields):
+        return self._clone(order=[
+            f"{self.fields[field.lstrip('-')]} {'DESC' if field.startswith('-') else 'ASC'}" for field in fields
+        ])
+
+    def values_list(self, *fields, flat=False):
+        return self._clone(value_fields=fields, flat=flat)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.start or item.step:
+            raise TypeError("Only [:stop] slices are supported.")
+        return self._clone(limit=item.stop)
+
+    def _sql(self, columns):
+        sql = f"SELECT {columns} FROM student_module sm JOIN auth_user u ON u.id = sm.student_id"
+        if self.where:
+            sql += " WHERE " + " AND ".join(clause for clause, _ in self.where)
+        if self.order:
+            sql += " ORDER BY " + ", ".join(self.order)
+        if self.limit is not None:
+            sql += f" LIMIT {int(self.limit)}"
+        return sql, [value for _, values in self.where for value in values]
+
+    def count(self):
+        sql, params = self._sql("COUNT(*)")
+        return self.database.fetch(sql, params)[0][0]
+
+    def iterator(self, chunk_size=2000):
+        """ Stream rows from a cursor, like Django's server-side cursor iteration. """
+        if self.value_fields:
+            sql, params = self._sql(", ".join(self.fields[field] for field in self.value_fields))
+            rows = self.database.stream(sql, params, chunk_size)
+            return (row[0] for row in rows) if self.flat else rows
+        sql, params = self._sql("sm.id, sm.course_id, sm.module_state_key, sm.state, sm.modified, u.id, u.username, u.email")
+        return (StudentModuleRow(row) for row in self.database.stream(sql, params, chunk_size))
+
+    def __iter__(self):
+        return self.iterator()
+
+
+class StudentModuleManager(object):
+    def __init__(self, database):
+        self.database = database
+
+    def all(self):
+        return StudentModuleQuerySet(self.database)
+
+    def select_related(self, *fields):
+        return self.all()
+
+    def filter(self, **conditions):
+        return self.all().filter(**conditions)
+
+
+class StudentModuleDatabase(object):
+    """
+    SQLite tables for users and StudentModule rows.
+
+    Each thread gets its own connection to a WAL-mode database file, so reads run
+    concurrently and only writes are serialised, as on a real database server.
+    """
+    def __init__(self, path=None):
+        if path is None:
+            handle, path = tempfile.mkstemp(prefix='advancedsurvey-loadtest-', suffix='.sqlite3')
+            os.close(handle)
+        self.path = path
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS auth_user (
+                id INTEGER PRIMARY KEY, username TEXT NOT NULL, email TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS student_module (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_id INTEGER NOT NULL REFERENCES auth_user (id),
+                course_id TEXT NOT NULL,
+                module_state_key TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT '{}',
+                modified REAL NOT NULL,
+                UNIQUE (student_id, module_state_key, course_id)
+            );
+            CREATE INDEX IF NOT EXISTS student_module_state_key
+                ON student_module (module_state_key, course_id, student_id);
+        """)
+
+    @property
+    def connection(self):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = sqlite3.connect(self.path, timeout=30)
+        return self.local.connection
+
+    def fetch(self, sql, params=()):
+        return self.connection.execute(sql, params).fetchall()
+
+    def stream(self, sql, params=(), chunk_size=2000):
+        # A separate connection, so other queries made while the rows are consumed don't reset the cursor.
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            cursor = connection.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            connection.close()
+
+    def add_user(self, user_id, username, email):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO auth_user (id, username, email) VALUES (?, ?, ?)", (user_id, username, email)
+            )
+
+    def get_state(self, student_id, course_id, module_state_key):
+        rows = self.fetch(
+            "SELECT state FROM student_module WHERE student_id = ? AND course_id = ? AND module_state_key = ?",
+            (student_id, str(course_id), str(module_state_key)),
+        )
+        return json.loads(rows[0][0]) if rows else {}
+
+    def set_state(self, student_id, course_id, module_state_key, state):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO student_module (student_id, course_id, module_state_key, state, modified) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (student_id, module_state_key, course_id) "
+                "DO UPDATE SET state = excluded.state, modified = excluded.modified",
+                (student_id, str(course_id), str(module_state_key), json.dumps(state), time.time()),
+            )
+
+
+class StringKey(str):
+    """ Stand-in for opaque_keys' CourseKey and UsageKey when edx-opaque-keys isn't installed. """
+    @classmethod
+    def from_string(cls, serialized):
+        return cls(serialized)
+
+    @property
+    def course_key(self):
+        # block-v1:Org+Course+Run+type@...+block@... belongs to course-v1:Org+Course+Run.
+        return StringKey('course-v1:' + self.partition(':')[2].split('+type@')[0])
+
+
+class HandlerRequestKeyValueStore(KeyValueStore):
+    """
+    Like the LMS FieldDataCache of a handler request, which only prefetches the user state of the
+    block handling the request: user_state of other blocks reads as unset, and writes go through.
+    """
+    def __init__(self, kvs, cached_usage_ids):
+        self.kvs = kvs
+        self.cached_usage_ids = {str(usage_id) for usage_id in cached_usage_ids}
+
+    def _is_cached(self, key):
+        return key.scope != Scope.user_state or str(key.block_scope_id) in self.cached_usage_ids
+
+    def get(self, key):
+        if not self._is_cached(key):
+            raise KeyError(key.field_name)
+        return self.kvs.get(key)
+
+    def set(self, key, value):
+        self.kvs.set(key, value)
+
+    def set_many(self, update_dict):
+        self.kvs.set_many(update_dict)
+
+    def delete(self, key):
+        self.kvs.delete(key)
+
+    def has(self, key):
+        return self._is_cached(key) and self.kvs.has(key)
+
+
+class StudentModuleKeyValueStore(KeyValueStore):
+    """
+    Keeps user_state fields in the StudentModule table, like the LMS does, and every other scope in memory.
+    """
+    def __init__(self, database, course_id):
+        self.database = database
+        self.course_id = course_id
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def _in_student_module(self, key):
+        return key.scope == Scope.user_state
+
+    def get(self, key):
+        if self._in_student_module(key):
+            state = self.database.get_state(key.user_id, self.course_id, key.block_scope_id)
+            if key.field_name not in state:
+                raise KeyError(key.field_name)
+            return state[key.field_name]
+        return self.data[key]
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, update_dict):
+        for key, value in update_dict.items():
+            if self._in_student_module(key):
+                with self.lock:
+                    state = self.database.get_state(key.user_id, self.course_id, key.block_scope_id)
+                    state[key.field_name] = value
+                    self.database.set_state(key.user_id, self.course_id, key.block_scope_id, state)
+            else:
+                self.data[key] = value
+
+    def delete(self, key):
+        if self._in_student_module(key):
+            with self.lock:
+                state = self.database.get_state(key.user_id, self.course_id, key.block_scope_id)
+                del state[key.field_name]
+                self.database.set_state(key.user_id, self.course_id, key.block_scope_id, state)
+        else:
+            del self.data[key]
+
+    def has(self, key):
+        try:
+            self.get(key)
+        except KeyError:
+            return False
+        return True
+
+
+class TranslationService(DummyTranslationService):
+    ugettext = staticmethod(_)
+
+
+class SettingsService(object):
+    """ Stand-in for the LMS settings service, serving XBlock settings buckets from a dict. """
+    def __init__(self, xblock_settings):
+        self.xblock_settings = xblock_settings
+
+    def get_settings_bucket(self, block, default=None):
+        block_class = getattr(block, 'unmixed_class', type(block))
+        return self.xblock_settings.get(getattr(block, 'block_settings_key', block_class.__name__), default)
+
+
+class PublishedEvents(object):
+    """ Thread-safe count of published events by type, shared between runtimes. """
+    def __init__(self):
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add(self, event_type):
+        with self.lock:
+            self.counts[event_type] = self.counts.get(event_type, 0) + 1
+
+
+class LoadTestRuntime(Runtime):
+    """
+    Minimal LMS-like runtime for one user: stores learner state through the given KeyValueStore,
+    loads other blocks from the modulestore and counts published events.
+    """
+    def __init__(self, kvs, course_id, modulestore, published, user_id=None, user_is_staff=False, xblock_settings=None):
+        super().__init__(
+            id_reader=MemoryIdManager(),
+            id_generator=MemoryIdManager(),
+            services={
+                'field-data': KvsFieldData(kvs),
+                'i18n': TranslationService(),
+                'settings': SettingsService(xblock_settings or {}),
+            },
+        )
+        self.course_id = course_id
+        self.modulestore = modulestore
+        self.published = published
+        self.current_user_id = user_id
+        self.user_is_staff = user_is_staff
+
+    def get_block(self, usage_id, for_parent=None):
+        try:
+            item = self.modulestore.get_item(usage_id)
+        except KeyError:
+            raise NoSuchUsage(repr(usage_id))  # pylint: disable=raise-missing-from
+        return self.construct_xblock_from_class(
+            getattr(type(item), 'unmixed_class', type(item)),
+            ScopeIds(self.current_user_id, item.scope_ids.block_type, item.scope_ids.def_id, item.scope_ids.usage_id),
+            for_parent=for_parent,
+        )
+
+    def handler_url(self, block, handler_name, suffix='', query='', thirdparty=False):
+        return f"/handler/{block.scope_ids.usage_id}/{handler_name}/{suffix}"
+
+    def resource_url(self, resource):
+        return f"/resource/{resource}"
+
+    def local_resource_url(self, block, uri):
+        return f"/local_resource/{block.scope_ids.block_type}/{uri}"
+
+    def publish(self, block, event_type, event_data):
+        self.published.add(event_type)
+
+
+# Modules replaced by install(), with what sys.modules held before (None if nothing), for uninstall().
+_replaced_modules = {}
+
+# Modules imported against the stand-ins, which must be imported again after uninstall().
+BOUND_MODULES = ('advancedsurvey.tasks',)
+
+
+def _module(name, **attributes):
+    """ Register a new module under name, replacing any existing one until uninstall(). """
+    _replaced_modules.setdefault(name, sys.modules.get(name))
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+def install(database, modulestore=None, report_root=None):
+    """
+    Register the stand-ins under the Open edX module paths and return the modulestore.
+
+    Any earlier install() is undone first. Call uninstall() to restore the modules that were replaced.
+    """
+    uninstall()
+    modulestore = modulestore or InMemoryModulestore()
+    report_store = FilesystemReportStore
+    if report_root:
+        report_store = type('FilesystemReportStore', (FilesystemReportStore,), {'root': report_root})
+
+    student_module = type('StudentModule', (object,), {'objects': StudentModuleManager(database)})
+
+    _module('celery', current_app=EagerCelery())
+    for name in ('lms', 'lms.djangoapps', 'lms.djangoapps.instructor_task', 'lms.djangoapps.courseware',
+                 'xmodule', 'xmodule.modulestore'):
+        _module(name)
+    _module('lms.djangoapps.instructor_task.models', ReportStore=report_store)
+    _module('lms.djangoapps.courseware.models', StudentModule=student_module)
+    _module('xmodule.modulestore.django', modulestore=lambda: modulestore)
+    try:
+        import opaque_keys.edx.keys  # pylint: disable=import-error, unused-import
+    except ImportError:
+        _module('opaque_keys')
+        _module('opaque_keys.edx')
+        _module('opaque_keys.edx.keys', CourseKey=StringKey, UsageKey=StringKey)
+    return modulestore
+
+
+def uninstall():
+    """
+    Restore the modules replaced by install(), and forget the modules that were imported against the stand-ins.
+    """
+    for name, module in _replaced_modules.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+    _replaced_modules.clear()
+
+    for name in BOUND_MODULES:
+        sys.modules.pop(name, None)
+        package_name, _, module_name = name.rpartition('.')
+        package = sys.modules.get(package_name)
+        if package is not None and hasattr(package, module_name):
+            delattr(package, module_name)
@@ -0,0 +1,159 @@
+"""
+Compact, column-oriented storage for survey results used by exports and analytics.
+"""
+import math
+import random
+import time
+from array import array
+
+# Code stored for a rate prompt that the learner did not answer.
+MISSING = -1
+
+
+class RateColumn(object):
+    """
+    Answers to a single prompt of a rate question, stored as small-integer codes.
+
+    Codes index into ``labels``, which is shared by every prompt of the same question.
+    """
+    def __init__(self, header, answer_key, labels, codes_by_option_id):
+        self.header = header
+        self.answer_key = answer_key
+        self.labels = labels
+        self.codes_by_option_id = codes_by_option_id
+        self.codes = array('h')
+
+    def append(self, answers):
+        answer = answers.get(self.answer_key)
+        code = MISSING
+        if answer and '-' in answer:
+            code = self.codes_by_option_id.get(answer.split('-', 1)[1], MISSING)
+        self.codes.append(code)
+
+    def answered_count(self):
+        return len(self.codes) - self.codes.count(MISSING)
+
+    def label(self, index):
+        code = self.codes[index]
+        return self.labels[code] if code != MISSING else ''
+
+    def counts(self):
+        """ Return the number of times each label was chosen, in label order. """
+        counts = [0] * len(self.labels)
+        for code in self.codes:
+            if code != MISSING:
+                counts[code] += 1
+        return counts
+
+
+class FreeColumn(object):
+    """
+    Answers to a free text question, kept as plain strings.
+    """
+    def __init__(self, header, answer_key):
+        self.header = header
+        self.answer_key = answer_key
+        self.values = []
+
+    def append(self, answers):
+        self.values.append(answers.get(self.answer_key) or '')
+
+    def answered_count(self):
+        return sum(1 for value in self.values if value)
+
+    def label(self, index):
+        return self.values[index]
+
+
+class SurveyResultSet(object):
+    """
+    In-memory result set for one survey block.
+
+    Rate answers are stored as ``array`` codes with a per-question label dictionary
+    and free text answers are kept in separate columns. Labels are only materialized
+    when rows are requested through ``iter_rows``.
+    """
+    user_headers = ['user_id', 'username', 'user_email']
+
+    def __init__(self, questions):
+        self.user_ids = array('q')
+        self.usernames = []
+        self.emails = []
+        self.columns = []
+
+        question_prefix = ""
+        for question in questions:
+            if 'header' in question:
+                question_prefix = f"{question['header']}: "
+
+            question_key = f"q-{question['question_id']}"
+            if question['type'] == 'rate':
+                labels = [option[1] for option in question['options']]
+                codes_by_option_id = {str(option[0]): code for code, option in enumerate(question['options'])}
+                for prompt in question['prompts']:
+                    self.columns.append(RateColumn(
+                        f"{question_prefix}{prompt[1]}",
+                        f"{question_key}-p-{prompt[0]}",
+                        labels,
+                        codes_by_option_id,
+                    ))
+            elif question['type'] == 'free':
+                self.columns.append(FreeColumn(f"{question_prefix}{question['prompt']}", question_key))
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def header_row(self):
+        return self.user_headers + [column.header for column in self.columns]
+
+    def add(self, user_id, username, email, answers):
+        """ Record one learner's answers. """
+        self.user_ids.append(user_id)
+        self.usernames.append(username)
+        self.emails.append(email)
+        for column in self.columns:
+            column.append(answers)
+
+    def iter_rows(self):
+        """ Yield each learner's row with answer labels materialized. """
+        for index in range(len(self)):
+            row = [self.user_ids[index], self.usernames[index], self.emails[index]]
+            row.extend(column.label(index) for column in self.columns)
+            yield row
+
+
+def reservoir_sample(rows, size, max_scan=None, time_budget=None):
+    """
+    Uniformly sample up to ``size`` items from ``rows`` using reservoir sampling.
+
+    The scan stops early after ``max_scan`` rows or ``time_budget`` seconds.
+    Returns a tuple of ``(sample, scanned, exhausted)`` where ``exhausted`` tells
+    whether every row was seen.
+    """
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    sample = []
+    scanned = 0
+    for row in rows:
+        if scanned < size:
+            sample.append(row)
+        else:
+            index = random.randint(0, scanned)
+            if index < size:
+                sample[index] = row
+        scanned += 1
+        if (max_scan is not None and scanned >= max_scan) or (deadline is not None and time.monotonic() >= deadline):
+            return sample, scanned, False
+    return sample, scanned, True
+
+
+def proportion_interval(successes, total, z=1.96):
+    """
+    Return the Wilson score interval ``(low, high)`` for ``successes`` out of ``total``.
+    """
+    if total == 0:
+        return 0.0, 1.0
+    proportion = successes / total
+    denominator = 1 + z * z / total
+    center = (proportion + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(proportion * (1 - proportion) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
@@ -9,6 +9,10 @@ function debounce(func, timeout = 300) {
     };
 }
 
+// Surveys on the page that can still be submitted. When a unit holds several of them, its
+// "Submit all surveys in this unit" button sends them all with a single batch_submit request.
+var advancedSurveyBlocks = [];
+
 function AdvancedSurveyXBlock(runtime, element) {
     var self = this;
     var exportStatus = {};
@@ -42,9 +46,14 @@ function AdvancedSurveyXBlock(runtime, element) {
     this.init = function() {
         // Initialization function for the Advanced Survey Block
         this.submitUrl = runtime.handlerUrl(element, 'submit');
+        this.batchSubmitUrl = runtime.handlerUrl(element, 'batch_submit');
+        this.usageId = $('div.advancedsurvey_block', element).data('usage-id');
+        // batch_submit only accepts surveys that are children of the same parent.
+        this.parentId = $('div.advancedsurvey_block', element).data('parent-id');
         this.csv_url= runtime.handlerUrl(element, 'csv_export');
 
-        this.submit = $('input[type=button]', element);
+        this.submit = $('input[name=submit]', element);
+        this.submitAll = $('input[name=submit-all]', element);
         
         this.exportResultsButton = $('.export-results-button', element);
         this.exportResultsButton.click(this.exportCsv);
@@ -66,6 +75,7 @@ function AdvancedSurveyXBlock(runtime, element) {
             return
         }
         
+        advancedSurveyBlocks.push(self);
         self.radios.bind("change.verifySubmittable", self.verifySubmittable);
         self.textAreas.bind("input.verifySubmittable", debounce(() => self.verifySubmittable()));
 
@@ -80,12 +90,50 @@ function AdvancedSurveyXBlock(runtime, element) {
             })
         });
 
+        self.submitAll.click(function () {
+            var surveys = self.getUnitSurveys();
+            let blocks = {};
+            surveys.forEach((survey) => {
+                // Disable the submit buttons to avoid multiple clicks
+                survey.disableSubmit();
+                survey.submitAll.attr("disabled", true);
+                blocks[survey.usageId] = survey.getAnswers();
+            });
+            $.ajax({
+                type: "POST",
+                url: self.batchSubmitUrl,
+                data: JSON.stringify({'blocks': blocks}),
+                success: (data) => self.onBatchSubmit(surveys, data)
+            });
+        });
+
         // If the user has refreshed the page, they may still have an answer
         // selected and the submit button should be enabled.
         self.verifySubmittable()
     };
 
-    this.verifySubmittable = function() {
+    this.getUnitSurveys = function() {
+        // The surveys of this survey's unit that can still be submitted, including this one.
+        return advancedSurveyBlocks.filter((survey) => (
+            survey === self || (self.parentId && survey.parentId === self.parentId)
+        ));
+    };
+
+    this.updateSubmitAll = function() {
+        // Show the "Submit all" buttons when the unit has several surveys left, and enable them
+        // once all of those are answered, since nothing is recorded unless every survey is accepted.
+        var surveys = self.getUnitSurveys();
+        var allSubmittable = surveys.every((survey) => survey.isSubmittable());
+        surveys.forEach((survey) => {
+            survey.submitAll.toggleClass("advancedsurvey-hidden", surveys.length < 2);
+            if (allSubmittable)
+                survey.submitAll.removeAttr("disabled");
+            else
+                survey.submitAll.attr("disabled", true);
+        });
+    };
+
+    this.isSubmittable = function() {
         let answers = self.getAnswers();
         
         // Verify that all radio questions have an answer selected
@@ -108,11 +156,16 @@ function AdvancedSurveyXBlock(runtime, element) {
             }
         });
 
+        return doEnable;
+    };
+
+    this.verifySubmittable = function() {
         // Enable or disable the submit button
-        if (doEnable)
+        if (self.isSubmittable())
             self.enableSubmit();
         else
             self.disableSubmit();
+        self.updateSubmitAll();
     }
 
     this.onSubmit = function (data) {
@@ -122,6 +175,10 @@ function AdvancedSurveyXBlock(runtime, element) {
         }
         var can_submit = data['can_submit'];
         if (!can_submit) {
+            var unitSurveys = self.getUnitSurveys();
+            advancedSurveyBlocks = advancedSurveyBlocks.filter((survey) => survey !== self);
+            self.submitAll.addClass("advancedsurvey-hidden");
+            unitSurveys.filter((survey) => survey !== self).forEach((survey) => survey.updateSubmitAll());
             // Disable all types of input within the survey
             $('input', element).attr('disabled', true);
             $('textarea', element).attr('disabled', true);
@@ -135,6 +192,20 @@ function AdvancedSurveyXBlock(runtime, element) {
         return;
     };
 
+    this.onBatchSubmit = function (surveys, data) {
+        if (data['success']) {
+            surveys.forEach((survey) => survey.onSubmit(data['results'][survey.usageId]));
+            return;
+        }
+        // Nothing was recorded, so every survey stays as it was.
+        let errors = (data['errors'] || []).slice();
+        Object.values(data['results'] || {}).forEach((result) => {
+            errors = errors.concat(result['errors'] || []);
+        });
+        alert(errors.join('\n'));
+        surveys.forEach((survey) => survey.verifySubmittable());
+    };
+
     this.disableSubmit = function() {
         // Disable the submit button.
         self.submit.attr("disabled", true);
@@ -1,5 +1,13 @@
 from __future__ import absolute_import
+import codecs
+import csv
+import hashlib
+import io
+import json
+import shutil
+import tempfile
 import time
+import uuid
 
 from celery import current_app  # pylint: disable=import-error
 
@@ -7,28 +15,201 @@ from lms.djangoapps.instructor_task.models import ReportStore  # pylint: disable
 from opaque_keys.edx.keys import CourseKey, UsageKey  # pylint: disable=import-error
 from xmodule.modulestore.django import modulestore  # pylint: disable=import-error
 
+# Parts and checkpoints live in a subdirectory of the course's report directory,
+# which ReportStore.links_for doesn't list, so they never show up as downloadable reports.
+EXPORT_WORK_DIR = 'advancedsurvey-export-work'
 
-@current_app.task(name='advancedsurvey.tasks.export_csv_data')
-def export_csv_data(block_id, course_id):
+# A checkpoint that hasn't been updated for this long belongs to a run that is gone,
+# and another run may take it over.
+CHECKPOINT_STALE_AFTER_S = 15 * 60
+
+
+class ExportInProgressError(Exception):
+    """ Raised when another run owns the block's export checkpoint. """
+
+
+def _work_filename(filename):
+    return u"{}/{}".format(EXPORT_WORK_DIR, filename)
+
+
+def _work_prefix(block_id):
+    """ Prefix of the names of every work file (checkpoints and parts) of the block's export. """
+    return u"advancedsurvey-export-{}".format(hashlib.sha1(block_id.encode('utf-8')).hexdigest())
+
+
+def _delete_report_file(report_store, course_key, filename):
+    path = report_store.path_to(course_key, filename)
+    if report_store.storage.exists(path):
+        report_store.storage.delete(path)
+
+
+def _list_work_files(report_store, course_key, prefix):
+    """ The block's work files, sorted by name. """
+    try:
+        _dirs, files = report_store.storage.listdir(report_store.path_to(course_key, EXPORT_WORK_DIR))
+    except OSError:
+        # No export has stored a work file for this course yet.
+        return []
+    return sorted(_work_filename(name) for name in files if name.startswith(prefix + u"."))
+
+
+def _list_checkpoints(report_store, course_key, prefix):
+    """ The block's checkpoints, oldest first. """
+    return [filename for filename in _list_work_files(report_store, course_key, prefix) if filename.endswith('.json')]
+
+
+def _load_checkpoint(report_store, course_key, prefix):
+    checkpoints = _list_checkpoints(report_store, course_key, prefix)
+    if not checkpoints:
+        return None
+    with report_store.storage.open(report_store.path_to(course_key, checkpoints[-1])) as checkpoint_file:
+        return json.loads(checkpoint_file.read())
+
+
+def _store_checkpoint(report_store, course_key, prefix, checkpoint):
+    """
+    Store the checkpoint under a new name, then remove the older ones, so that a checkpoint exists
+    at every moment even if the worker is killed in between.
+    """
+    checkpoint['updated_at'] = time.time()
+    checkpoint['sequence'] = checkpoint.get('sequence', 0) + 1
+    filename = _work_filename(u"{}.checkpoint{:010d}.json".format(prefix, checkpoint['sequence']))
+    report_store.store(course_key, filename, io.BytesIO(json.dumps(checkpoint).encode('utf-8')))
+    for old_filename in _list_checkpoints(report_store, course_key, prefix):
+        if old_filename != filename:
+            _delete_report_file(report_store, course_key, old_filename)
+
+
+def _check_ownership(report_store, course_key, prefix, checkpoint):
+    """ Make sure no other run took over the checkpoint before this run writes to it. """
+    stored = _load_checkpoint(report_store, course_key, prefix)
+    if stored is None or stored['run_id'] != checkpoint['run_id']:
+        raise ExportInProgressError(u"The export was taken over by another run.")
+
+
+def _store_part(report_store, course_key, prefix, checkpoint, rows):
+    """
+    Store rows as the next part of the report.
+
+    Parts are written without a byte order mark (unlike ReportStore.store_rows), so they can be
+    joined byte for byte. Part names include the run id, so concurrent runs never write the same file.
+    """
+    part = _work_filename(u"{}.{}.part{:010d}.csv".format(prefix, checkpoint['run_id'], len(checkpoint['parts'])))
+    buff = io.StringIO()
+    csv.writer(buff).writerows(rows)
+    _delete_report_file(report_store, course_key, part)
+    report_store.store(course_key, part, io.BytesIO(buff.getvalue().encode('utf-8')))
+    checkpoint['parts'].append(part)
+
+
+def _sweep_parts(report_store, course_key, prefix, checkpoint):
+    """
+    Delete parts the checkpoint doesn't list, left behind by runs killed between storing a part
+    and storing the checkpoint that refers to it.
+    """
+    for filename in _list_work_files(report_store, course_key, prefix):
+        if not filename.endswith('.json') and filename not in checkpoint['parts']:
+            _delete_report_file(report_store, course_key, filename)
+
+
+def _delete_work_files(report_store, course_key, prefix):
+    """
+    Delete the block's checkpoints first, then its parts, so an interrupted cleanup never leaves
+    a checkpoint pointing at deleted parts.
+    """
+    for filename in _list_checkpoints(report_store, course_key, prefix):
+        _delete_report_file(report_store, course_key, filename)
+    for filename in _list_work_files(report_store, course_key, prefix):
+        _delete_report_file(report_store, course_key, filename)
+
+
+def checkpoint_updated_at(block_id, course_id):
+    """ When the block's export checkpoint was last stored, or None if there is no checkpoint. """
+    report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+    checkpoint = _load_checkpoint(report_store, CourseKey.from_string(course_id), _work_prefix(block_id))
+    return checkpoint.get('updated_at') if checkpoint else None
+
+
+@current_app.task(name='advancedsurvey.tasks.export_csv_data', bind=True, acks_late=True)
+def export_csv_data(self, block_id, course_id):
     """
     Exports student answers to all supported questions to a CSV file.
+
+    Learners are exported in batches, each stored as a part of the report, and a checkpoint
+    with the last exported student id is kept in report storage. If the export is interrupted,
+    the next run for the same block resumes from the checkpoint instead of starting over.
+
+    The checkpoint records the task and run that own it. A run refuses to touch a checkpoint whose
+    task is still running, unless the checkpoint is stale. A redelivery of the same task takes the
+    checkpoint over, and the run it replaced stops at its next write.
     """
 
     src_block = modulestore().get_item(UsageKey.from_string(block_id))
-
-    start_timestamp = time.time()
     course_key = CourseKey.from_string(course_id)
+    report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+    prefix = _work_prefix(block_id)
+    header_row = src_block.export_header_row()
 
-    filename = src_block.get_filename()
+    checkpoint = _load_checkpoint(report_store, course_key, prefix)
+    if checkpoint is not None:
+        owner_task_id = checkpoint.get('task_id')
+        owner_running = owner_task_id != self.request.id and not self.AsyncResult(owner_task_id).ready()
+        is_stale = time.time() - checkpoint.get('updated_at', 0) > CHECKPOINT_STALE_AFTER_S
+        if owner_running and not is_stale:
+            raise ExportInProgressError(u"Another export of this block is already running.")
 
-    report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
-    report_store.store_rows(course_key, filename, src_block.prepare_data())
+        if checkpoint['header_row'] != header_row:
+            # The questions changed since the checkpoint was taken, so its parts can't be reused.
+            _delete_work_files(report_store, course_key, prefix)
+            checkpoint = None
+
+    if checkpoint is None:
+        checkpoint = {
+            'report_filename': src_block.get_filename(),
+            'start_timestamp': time.time(),
+            'header_row': header_row,
+            'last_student_id': None,
+            'parts': [],
+        }
+
+    checkpoint['task_id'] = self.request.id
+    checkpoint['run_id'] = uuid.uuid4().hex
+    if not checkpoint['parts']:
+        _store_part(report_store, course_key, prefix, checkpoint, [header_row])
+    _store_checkpoint(report_store, course_key, prefix, checkpoint)
+    # This run owns the checkpoint now; remove what earlier runs left behind.
+    _sweep_parts(report_store, course_key, prefix, checkpoint)
+
+    for last_student_id, result_set in src_block.iter_export_batches(checkpoint['last_student_id']):
+        _check_ownership(report_store, course_key, prefix, checkpoint)
+        _store_part(report_store, course_key, prefix, checkpoint, result_set.iter_rows())
+        checkpoint['last_student_id'] = last_student_id
+        _check_ownership(report_store, course_key, prefix, checkpoint)
+        _store_checkpoint(report_store, course_key, prefix, checkpoint)
+        self.update_state(state='PROGRESS', meta={
+            'last_student_id': last_student_id,
+            'parts_written': len(checkpoint['parts']),
+        })
+
+    _check_ownership(report_store, course_key, prefix, checkpoint)
+    with tempfile.TemporaryFile() as report:
+        # Match the byte order mark that ReportStore.store_rows puts at the start of reports.
+        report.write(codecs.BOM_UTF8)
+        for part in checkpoint['parts']:
+            with report_store.storage.open(report_store.path_to(course_key, part)) as part_file:
+                shutil.copyfileobj(part_file, report)
+        report.seek(0)
+        _delete_report_file(report_store, course_key, checkpoint['report_filename'])
+        report_store.store(course_key, checkpoint['report_filename'], report)
+
+    _delete_work_files(report_store, course_key, prefix)
 
+    start_timestamp = checkpoint['start_timestamp']
     generation_time_s = time.time() - start_timestamp
 
     return {
         "error": None,
-        "report_filename": filename,
+        "report_filename": checkpoint['report_filename'],
         "start_timestamp": start_timestamp,
         "generation_time_s": generation_time_s,
-    }
\ No newline at end of file
+    }
@@ -1,7 +1,5 @@
 # -*- coding: utf-8 -*-
 #
-from bleach.sanitizer import Cleaner
-from markdown import markdown
 
 
 # Make '_' a no-op so we can scrape strings
@@ -16,12 +14,14 @@ def ngettext_fallback(text_singular, text_plural, number):
 
 def remove_html_tags(data):
     """ Remove html tags from provided data """
+    from bleach.sanitizer import Cleaner
     cleaner = Cleaner(tags=[], strip=True)
     return cleaner.clean(data)
 
 
 def remove_markdown_and_html_tags(data):
     """ Remove both markdown and html tags from provided data """
+    from markdown import markdown
     return remove_html_tags(markdown(data))
 
 
@@ -29,6 +29,7 @@ setup(
     license='AGPL v3',
     packages=[
         'advancedsurvey',
+        'advancedsurvey.loadtest',
     ],
     install_requires=[
         'XBlock',
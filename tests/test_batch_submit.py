@@ -0,0 +1,115 @@
+"""
+Tests for submitting the surveys of a vertical with one batch_submit request.
+"""
+import json
+
+import pytest
+from webob import Request
+
+from advancedsurvey.loadtest.driver import COURSE_ID, USAGE_ID, LoadTest
+from advancedsurvey.loadtest.standins import VerticalBlock
+
+USER_ID = 1
+OTHER_VERTICAL_ID = 'block-v1:LoadTest+LT101+run+type@vertical+block@other'
+OTHER_USAGE_ID = USAGE_ID.format('-other')
+
+
+@pytest.fixture
+def load_test():
+    with LoadTest(blocks=3) as load_test:
+        load_test.add_learners(1)
+
+        # A survey in another vertical of the same course.
+        author_runtime = load_test.get_runtime(None, user_is_staff=True)
+        vertical = load_test.get_block(author_runtime, OTHER_VERTICAL_ID, VerticalBlock, 'vertical')
+        vertical.children = [load_test.usage_key(OTHER_USAGE_ID)]
+        vertical.save()
+        load_test.modulestore.add_item(vertical)
+        block = load_test.get_block(author_runtime, OTHER_USAGE_ID)
+        block.parent = load_test.usage_key(OTHER_VERTICAL_ID)
+        block.save()
+        load_test.modulestore.add_item(block)
+        yield load_test
+
+
+def _call(load_test, usage_id, handler_name, data):
+    # Like the LMS, only the user state of the block handling the request is loaded up front.
+    runtime = load_test.get_runtime(USER_ID, handler_usage_id=usage_id)
+    block = load_test.get_block(runtime, usage_id)
+    request = Request.blank('/', method='POST', body=json.dumps(data).encode('utf-8'))
+    return json.loads(runtime.handle(block, handler_name, request).body)
+
+
+def _batch_submit(load_test, blocks_data):
+    return _call(load_test, load_test.usage_ids[0], 'batch_submit', {'blocks': blocks_data})
+
+
+def _stored_answers(load_test, usage_id):
+    return load_test.database.get_state(USER_ID, COURSE_ID, usage_id).get('answers')
+
+
+def _answers(load_test, usage_ids):
+    runtime = load_test.get_runtime(USER_ID)
+    return {usage_id: load_test.random_answers(load_test.get_block(runtime, usage_id)) for usage_id in usage_ids}
+
+
+def test_batch_submit_records_every_survey(load_test):
+    response = _batch_submit(load_test, _answers(load_test, load_test.usage_ids))
+
+    assert response['success'] is True
+    assert all(result['success'] for result in response['results'].values())
+    for usage_id in load_test.usage_ids:
+        assert _stored_answers(load_test, usage_id)
+        assert load_test.database.get_state(USER_ID, COURSE_ID, usage_id)['submissions_count'] == 1
+    assert load_test.published.counts == {'completion': 3, 'xblock.advancedsurvey.batch_submitted': 1}
+
+
+def test_batch_submit_records_nothing_if_any_survey_is_invalid(load_test):
+    blocks_data = _answers(load_test, load_test.usage_ids)
+    blocks_data[load_test.usage_ids[2]] = {}
+
+    response = _batch_submit(load_test, blocks_data)
+
+    assert response['success'] is False
+    assert response['results'][load_test.usage_ids[0]]['success'] is True
+    assert response['results'][load_test.usage_ids[2]]['success'] is False
+    assert all(_stored_answers(load_test, usage_id) is None for usage_id in load_test.usage_ids)
+    assert load_test.published.counts == {}
+
+
+@pytest.mark.parametrize('usage_id', [OTHER_USAGE_ID, USAGE_ID.format('-missing')])
+def test_batch_submit_rejects_surveys_outside_the_vertical(load_test, usage_id):
+    blocks_data = _answers(load_test, load_test.usage_ids[:1] + [OTHER_USAGE_ID])
+    blocks_data[usage_id] = blocks_data.pop(OTHER_USAGE_ID)
+
+    response = _batch_submit(load_test, blocks_data)
+
+    assert response['success'] is False
+    assert response['results'][usage_id]['success'] is False
+    assert _stored_answers(load_test, load_test.usage_ids[0]) is None
+    assert _stored_answers(load_test, OTHER_USAGE_ID) is None
+    assert load_test.published.counts == {}
+
+
+def test_batch_submit_rejects_a_sibling_submitted_before(load_test):
+    blocks_data = _answers(load_test, load_test.usage_ids)
+    sibling_id = load_test.usage_ids[1]
+    assert _call(load_test, sibling_id, 'submit', blocks_data[sibling_id])['success']
+    submitted = _stored_answers(load_test, sibling_id)
+    load_test.published.counts.clear()
+
+    response = _batch_submit(load_test, blocks_data)
+
+    assert response['success'] is False
+    assert response['results'][sibling_id]['success'] is False
+    assert _stored_answers(load_test, sibling_id) == submitted
+    assert load_test.database.get_state(USER_ID, COURSE_ID, sibling_id)['submissions_count'] == 1
+    assert _stored_answers(load_test, load_test.usage_ids[0]) is None
+    assert load_test.published.counts == {}
+
+
+@pytest.mark.parametrize('data', [{'blocks': []}, {'blocks': {USAGE_ID.format(0): []}}, {'blocks': 'all'}, []])
+def test_batch_submit_rejects_malformed_payloads(load_test, data):
+    response = _call(load_test, load_test.usage_ids[0], 'batch_submit', data)
+    assert response['success'] is False
+    assert response['errors']
@@ -0,0 +1,72 @@
+"""
+Import-time budget for the ``advancedsurvey`` XBlock entry point.
+"""
+import json
+import os
+import subprocess
+import sys
+
+# A cold ``import advancedsurvey`` takes 250-300 ms, almost all of it spent importing XBlock
+# (xblock.core imports pkg_resources). The budget covers only the advancedsurvey modules and the modules
+# they newly load once XBlock and web_fragments are imported, measured at 3-7 ms (most of it creating
+# the XBlock class). The rest of the budget is headroom for slower CI machines; which modules are
+# deferred is checked separately by test_entry_point_does_not_import_deferred_modules.
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('ADVANCEDSURVEY_IMPORT_TIME_BUDGET_MS', 25))
+XBLOCK_IMPORTS = "import xblock.core, xblock.fields, xblock.completable, web_fragments.fragment"
+
+# Modules that should only be imported when they are used, not when the entry point is loaded.
+DEFERRED_MODULES = ['django', 'markdown', 'bleach', 'six', 'xblockutils.resources']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code, *options):
+    return subprocess.run(
+        [sys.executable, *options, '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+
+
+def _loaded_modules(import_statement, names=None):
+    """
+    Return the modules in sys.modules after running import_statement in a fresh interpreter,
+    limited to names if given.
+    """
+    output = _run(
+        f"import json, sys; {import_statement}; print(json.dumps(sorted(sys.modules)))"
+    ).stdout
+    modules = set(json.loads(output))
+    return modules if names is None else modules & set(names)
+
+
+def test_entry_point_does_not_import_deferred_modules():
+    # XBlock's own dependencies may pull some of these in (python-dateutil imports six),
+    # which this package can't avoid, so only modules it adds on top of XBlock are checked.
+    imported_by_xblock = _loaded_modules(XBLOCK_IMPORTS, DEFERRED_MODULES)
+    imported_by_entry_point = _loaded_modules("import advancedsurvey", DEFERRED_MODULES)
+    assert imported_by_entry_point - imported_by_xblock == set()
+
+
+def _added_import_time_ms():
+    """
+    Import advancedsurvey after XBlock in a fresh interpreter and return the time spent importing
+    advancedsurvey and the modules it newly loads, in ms.
+    """
+    stderr = _run(f"{XBLOCK_IMPORTS}; import advancedsurvey", '-X', 'importtime').stderr
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _self_time, cumulative_time, module_name = line.split('|')
+        # -X importtime reports each first import once, indented under the import that triggered it,
+        # so the cumulative time of the top-level (unindented) advancedsurvey entry covers exactly what it added.
+        if module_name.rstrip() == ' advancedsurvey':
+            return int(cumulative_time) / 1000
+    raise AssertionError("advancedsurvey missing from the -X importtime output")
+
+
+def test_cold_import_time_budget():
+    # The best of a few runs filters out noise from other processes on the machine.
+    import_time_ms = min(_added_import_time_ms() for _ in range(3))
+    assert import_time_ms < IMPORT_TIME_BUDGET_MS, (
+        f"advancedsurvey added {import_time_ms:.1f} ms to a cold import of XBlock (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)"
+    )
@@ -0,0 +1,42 @@
+"""
+Tests for the load-test harness itself.
+"""
+import json
+import sys
+
+from webob import Request
+
+from advancedsurvey.loadtest.driver import LoadTest, percentile
+
+
+def test_close_restores_the_replaced_modules(tmp_path):
+    before = {name: sys.modules.get(name) for name in ('celery', 'lms', 'xmodule.modulestore.django')}
+
+    with LoadTest(report_root=str(tmp_path)):
+        from advancedsurvey import tasks  # pylint: disable=unused-import
+        assert sys.modules['lms.djangoapps.instructor_task.models'].ReportStore.root == str(tmp_path)
+
+    assert {name: sys.modules.get(name) for name in before} == before
+    assert 'lms.djangoapps.instructor_task.models' not in sys.modules
+    # tasks.py was imported against the stand-ins, so it is imported again next time.
+    assert 'advancedsurvey.tasks' not in sys.modules
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 10))
+    assert percentile(values, 0.5) == 5
+    assert percentile(values, 0.95) == 9
+    assert percentile(values, 0.0) == 1
+    assert percentile([], 0.5) == 0.0
+
+
+def test_export_status_links_the_report(tmp_path):
+    with LoadTest(report_root=str(tmp_path)) as load_test:
+        load_test.run(5, 0, 1)
+        runtime = load_test.get_runtime(-1, user_is_staff=True)
+        block = load_test.get_block(runtime, load_test.usage_ids[0])
+        request = Request.blank('/', method='POST', body=b'{}')
+        status = json.loads(runtime.handle(block, 'csv_export', request).body)
+
+    filename = status['last_export_result']['report_filename']
+    assert status['download_url'] == 'file://' + str(tmp_path / 'GRADES_DOWNLOAD' / 'course-v1_LoadTest+LT101+run' / filename)
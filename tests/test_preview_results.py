@@ -0,0 +1,108 @@
+"""
+Tests for the sampled results preview handler.
+"""
+import json
+import random
+
+import pytest
+from webob import Request
+
+from advancedsurvey.loadtest.driver import LoadTest
+
+LEARNERS = 200
+
+
+def _answers(block, option_index):
+    """ Answers picking the option at option_index for every rate prompt. """
+    answers = {}
+    for question in block.questions:
+        if question['type'] == 'rate':
+            option_id = question['options'][option_index][0]
+            answers[str(question['question_id'])] = {
+                str(prompt[0]): f"o-{option_id}" for prompt in question['prompts']
+            }
+        else:
+            answers[str(question['question_id'])] = "Preview test answer"
+    return answers
+
+
+def _call(load_test, user_id, handler_name, data, user_is_staff=False):
+    runtime = load_test.get_runtime(user_id, user_is_staff=user_is_staff)
+    block = load_test.get_block(runtime, load_test.usage_ids[0])
+    request = Request.blank('/', method='POST', body=json.dumps(data).encode('utf-8'))
+    return json.loads(runtime.handle(block, handler_name, request).body)
+
+
+@pytest.fixture
+def load_test():
+    with LoadTest() as load_test:
+        block = load_test.get_block(load_test.get_runtime(None), load_test.usage_ids[0])
+        # The earlier half of the learners pick the first option, the later half the last one,
+        # so a preview that only reads the earliest rows is easy to spot.
+        for user_id in load_test.add_learners(LEARNERS):
+            option_index = 0 if user_id <= LEARNERS // 2 else -1
+            assert _call(load_test, user_id, 'submit', _answers(block, option_index))['success']
+        yield load_test
+
+
+def _preview(load_test, data=None):
+    return _call(load_test, -1, 'preview_results', data or {}, user_is_staff=True)
+
+
+def test_preview_requires_permission(load_test):
+    response = _call(load_test, 1, 'preview_results', {})
+    assert response['success'] is False
+    assert response['errors']
+
+
+def test_preview_of_a_small_block_is_complete(load_test):
+    response = _preview(load_test, {'sample_size': LEARNERS})
+
+    assert response['success'] is True
+    assert (response['complete'], response['exact']) == (True, True)
+    assert response['population'] == response['sample_size'] == response['scanned'] == LEARNERS
+    assert response['responses']['estimated_total'] == LEARNERS
+    first, *_, last = response['prompts'][0]['options']
+    assert (first['count'], last['count']) == (LEARNERS // 2, LEARNERS // 2)
+
+
+def test_preview_sample_is_not_exact_when_smaller_than_the_block(load_test):
+    response = _preview(load_test, {'sample_size': 50})
+
+    assert (response['complete'], response['exact']) == (True, False)
+    assert response['sample_size'] == 50
+    assert response['responses']['estimated_total'] == LEARNERS
+
+
+@pytest.mark.parametrize('requested, expected', [(0, 1), (10 ** 6, LEARNERS), ('many', LEARNERS)])
+def test_preview_clamps_the_sample_size(load_test, monkeypatch, requested, expected):
+    monkeypatch.setattr(load_test.block_class, 'preview_sample_size', LEARNERS)
+    assert _preview(load_test, {'sample_size': requested})['sample_size'] == expected
+
+
+def test_preview_samples_large_blocks_from_random_windows(load_test, monkeypatch):
+    random.seed(1234)
+    load_test.xblock_settings['AdvancedSurveyXBlock'] = {
+        'PREVIEW_MAX_SCAN': '100', 'PREVIEW_SAMPLE_SIZE': '60', 'PREVIEW_TIME_BUDGET_S': '5',
+    }
+    monkeypatch.setattr(load_test.block_class, 'preview_window_size', 10)
+    response = _preview(load_test)
+
+    assert (response['complete'], response['exact']) == (False, False)
+    assert response['population'] == LEARNERS
+    assert response['sample_size'] == response['scanned'] == 60
+    # Estimates are scaled to every learner of the block, not to the rows read.
+    assert response['responses']['estimated_total'] == LEARNERS
+    first, *_, last = response['prompts'][0]['options']
+    # Half of the learners picked each option; reading only the earliest rows would give 100% / 0%.
+    assert 0.25 < first['proportion'] < 0.75
+    assert 0.25 < last['proportion'] < 0.75
+
+
+def test_preview_ignores_invalid_settings(load_test):
+    load_test.xblock_settings['AdvancedSurveyXBlock'] = {
+        'PREVIEW_MAX_SCAN': 'all', 'PREVIEW_SAMPLE_SIZE': None, 'PREVIEW_TIME_BUDGET_S': 'soon',
+    }
+    response = _preview(load_test)
+    assert response['success'] is True
+    assert response['complete'] is True
@@ -0,0 +1,105 @@
+"""
+Tests for the compact survey result set and the sampling helpers.
+"""
+import random
+
+import pytest
+
+from advancedsurvey.results import MISSING, SurveyResultSet, proportion_interval, reservoir_sample
+
+QUESTIONS = [
+    {
+        'question_id': 0, 'type': 'rate', 'header': 'Content',
+        'prompts': [[0, 'Useful'], [1, 'Structured']],
+        'options': [[0, 'Excellent'], [1, 'Good'], [5, 'Poor']],
+    },
+    {'question_id': 1, 'type': 'free', 'prompt': 'Comments'},
+    {'question_id': 2, 'type': 'free', 'header': 'More', 'prompt': 'Anything else?'},
+]
+
+
+def test_header_row():
+    assert SurveyResultSet(QUESTIONS).header_row() == [
+        'user_id', 'username', 'user_email',
+        'Content: Useful', 'Content: Structured', 'Content: Comments', 'More: Anything else?',
+    ]
+
+
+def test_rate_answers_are_stored_as_codes():
+    result_set = SurveyResultSet(QUESTIONS)
+    result_set.add(7, 'learner', 'learner@example.com', {'q-0-p-0': 'o-5', 'q-0-p-1': 'o-0', 'q-1': 'Nice'})
+
+    useful, structured = result_set.columns[:2]
+    assert list(useful.codes) == [2]
+    assert list(structured.codes) == [0]
+    # Prompts of the same question share one label list.
+    assert useful.labels is structured.labels
+    assert list(result_set.iter_rows()) == [
+        [7, 'learner', 'learner@example.com', 'Poor', 'Excellent', 'Nice', ''],
+    ]
+
+
+def test_missing_and_unknown_answers_keep_rows_aligned():
+    result_set = SurveyResultSet(QUESTIONS)
+    result_set.add(1, 'a', 'a@example.com', {'q-0-p-1': 'o-9', 'q-2': 'Later'})
+    result_set.add(2, 'b', 'b@example.com', {'q-0-p-0': 'none'})
+
+    assert [list(column.codes) for column in result_set.columns[:2]] == [[MISSING, MISSING], [MISSING, MISSING]]
+    assert list(result_set.iter_rows()) == [
+        [1, 'a', 'a@example.com', '', '', '', 'Later'],
+        [2, 'b', 'b@example.com', '', '', '', ''],
+    ]
+
+
+def test_counts_and_answered_count():
+    result_set = SurveyResultSet(QUESTIONS)
+    result_set.add(1, 'a', 'a@example.com', {'q-0-p-0': 'o-1', 'q-1': 'Yes'})
+    result_set.add(2, 'b', 'b@example.com', {'q-0-p-0': 'o-1'})
+    result_set.add(3, 'c', 'c@example.com', {'q-0-p-0': 'o-0'})
+
+    useful, structured, comments = result_set.columns[:3]
+    assert len(result_set) == 3
+    assert useful.counts() == [1, 2, 0]
+    assert useful.answered_count() == 3
+    assert structured.answered_count() == 0
+    assert comments.answered_count() == 1
+
+
+def test_reservoir_sample_keeps_everything_when_small():
+    sample, scanned, exhausted = reservoir_sample(range(5), 10)
+    assert sorted(sample) == [0, 1, 2, 3, 4]
+    assert (scanned, exhausted) == (5, True)
+
+
+def test_reservoir_sample_is_bounded():
+    sample, scanned, exhausted = reservoir_sample(range(1000), 10, max_scan=100)
+    assert len(sample) == 10
+    assert all(0 <= item < 100 for item in sample)
+    assert (scanned, exhausted) == (100, False)
+
+
+def test_reservoir_sample_stops_at_time_budget():
+    sample, scanned, exhausted = reservoir_sample(iter(range(10 ** 9)), 10, time_budget=0)
+    assert (len(sample), scanned, exhausted) == (1, 1, False)
+
+
+def test_reservoir_sample_is_roughly_uniform():
+    random.seed(1234)
+    hits = [0] * 10
+    for _ in range(2000):
+        sample, _, _ = reservoir_sample(range(10), 2)
+        for item in sample:
+            hits[item] += 1
+    # Every item is expected 400 times.
+    assert all(300 < count < 500 for count in hits)
+
+
+def test_proportion_interval():
+    assert proportion_interval(0, 0) == (0.0, 1.0)
+    low, high = proportion_interval(50, 100)
+    assert low == pytest.approx(0.4038, abs=1e-4)
+    assert high == pytest.approx(0.5962, abs=1e-4)
+    low, high = proportion_interval(0, 20)
+    assert low == 0.0 and 0 < high < 0.2
+    low, high = proportion_interval(20, 20)
+    assert 0.8 < low < 1 and high == 1.0
@@ -0,0 +1,208 @@
+"""
+Tests for the resumable CSV export task, run against the load-test stand-ins.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+
+import pytest
+from webob import Request
+
+from advancedsurvey.loadtest.driver import COURSE_ID, LoadTest
+from advancedsurvey.loadtest.standins import PendingResult
+
+LEARNERS = 35
+
+
+@pytest.fixture
+def load_test(tmp_path, monkeypatch):
+    with LoadTest(report_root=str(tmp_path)) as load_test:
+        load_test.run(LEARNERS, 0, 4)
+        monkeypatch.setattr(load_test.block_class, 'export_batch_size', 10)
+        yield load_test
+
+
+@pytest.fixture
+def tasks(load_test):
+    from advancedsurvey import tasks  # Import after the stand-ins are installed
+    return tasks
+
+
+def _report_store(tasks):
+    return tasks.ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+
+
+def _export(tasks, load_test, task_id):
+    return tasks.export_csv_data.apply_async(args=(load_test.usage_ids[0], COURSE_ID), task_id=task_id)
+
+
+def _interrupt_after(monkeypatch, block_class, batches):
+    """ Make exports fail after the given number of batches, as if the worker were killed. """
+    iter_export_batches = block_class.iter_export_batches
+    calls = []
+
+    def interrupted(self, after_student_id=None, batch_size=None):
+        calls.append(after_student_id)
+        for index, batch in enumerate(iter_export_batches(self, after_student_id, batch_size)):
+            if index == batches:
+                raise RuntimeError("Worker killed")
+            yield batch
+
+    monkeypatch.setattr(block_class, 'iter_export_batches', interrupted)
+    return calls
+
+
+def _work_files(tasks):
+    work_dir = _report_store(tasks).path_to(COURSE_ID, tasks.EXPORT_WORK_DIR)
+    return sorted(os.listdir(work_dir)) if os.path.isdir(work_dir) else []
+
+
+def _exported_student_ids(tasks, result):
+    report_store = _report_store(tasks)
+    with open(report_store.path_to(COURSE_ID, result.result['report_filename']), encoding='utf-8-sig') as report:
+        return [int(row[0]) for row in list(csv.reader(report))[1:]]
+
+
+def test_export_writes_a_single_report(load_test, tasks):
+    result = _export(tasks, load_test, 'task-1')
+    assert result.successful(), result.result
+
+    report_store = _report_store(tasks)
+    links = report_store.links_for(COURSE_ID)
+    assert [filename for filename, _ in links] == [result.result['report_filename']]
+    assert _work_files(tasks) == []
+
+    with open(report_store.path_to(COURSE_ID, result.result['report_filename']), 'rb') as report:
+        content = report.read()
+    assert content.startswith(codecs.BOM_UTF8)
+    assert content.count(codecs.BOM_UTF8) == 1
+    rows = list(csv.reader(io.StringIO(content[len(codecs.BOM_UTF8):].decode('utf-8'))))
+    assert rows[0] == load_test.modulestore.get_item(load_test.usage_ids[0]).export_header_row()
+    assert [int(row[0]) for row in rows[1:]] == list(range(1, LEARNERS + 1))
+
+
+def test_interrupted_export_resumes_from_checkpoint(load_test, tasks, monkeypatch):
+    _interrupt_after(monkeypatch, load_test.block_class, 2)
+    failed = _export(tasks, load_test, 'task-1')
+    assert not failed.successful()
+
+    # Work files are kept for the next run, but never listed as downloadable reports.
+    assert _report_store(tasks).links_for(COURSE_ID) == []
+    assert len(_work_files(tasks)) == 4  # Checkpoint, header and two batches
+
+    monkeypatch.undo()
+    monkeypatch.setattr(load_test.block_class, 'export_batch_size', 10)
+    calls = _interrupt_after(monkeypatch, load_test.block_class, 100)
+    result = _export(tasks, load_test, 'task-2')
+    assert result.successful(), result.result
+    # The second run started after the last student of the first run's two batches.
+    assert calls == [20]
+
+    report_store = _report_store(tasks)
+    with open(report_store.path_to(COURSE_ID, result.result['report_filename']), encoding='utf-8-sig') as report:
+        rows = list(csv.reader(report))
+    assert [int(row[0]) for row in rows[1:]] == list(range(1, LEARNERS + 1))
+    assert _work_files(tasks) == []
+
+
+def test_export_refuses_a_checkpoint_owned_by_a_running_task(load_test, tasks, monkeypatch):
+    _interrupt_after(monkeypatch, load_test.block_class, 1)
+    _export(tasks, load_test, 'task-1')
+    monkeypatch.undo()
+
+    # Pretend the first task is still running.
+    monkeypatch.setattr(tasks.export_csv_data, 'results', {})
+    result = _export(tasks, load_test, 'task-2')
+    assert isinstance(result.result, tasks.ExportInProgressError)
+
+    # Once the checkpoint is stale, a new run takes it over.
+    monkeypatch.setattr(tasks, 'CHECKPOINT_STALE_AFTER_S', -1)
+    result = _export(tasks, load_test, 'task-3')
+    assert result.successful(), result.result
+
+
+def test_redelivered_task_takes_over_its_checkpoint(load_test, tasks, monkeypatch):
+    _interrupt_after(monkeypatch, load_test.block_class, 1)
+    _export(tasks, load_test, 'task-1')
+    monkeypatch.undo()
+    monkeypatch.setattr(tasks.export_csv_data, 'results', {})
+
+    result = _export(tasks, load_test, 'task-1')
+    assert result.successful(), result.result
+
+
+def test_kill_while_replacing_the_checkpoint_keeps_one(load_test, tasks, monkeypatch):
+    delete_report_file = tasks._delete_report_file  # pylint: disable=protected-access
+
+    def killed_on_checkpoint_delete(report_store, course_key, filename):
+        if filename.endswith('.json'):
+            raise RuntimeError("Worker killed")
+        delete_report_file(report_store, course_key, filename)
+
+    # The first checkpoint has nothing to replace; the kill hits after the first batch's checkpoint is stored.
+    monkeypatch.setattr(tasks, '_delete_report_file', killed_on_checkpoint_delete)
+    assert not _export(tasks, load_test, 'task-1').successful()
+    assert len([name for name in _work_files(tasks) if name.endswith('.json')]) == 2
+
+    monkeypatch.setattr(tasks, '_delete_report_file', delete_report_file)
+    calls = _interrupt_after(monkeypatch, load_test.block_class, 100)
+    result = _export(tasks, load_test, 'task-2')
+    assert result.successful(), result.result
+    # Resumed from the newer checkpoint.
+    assert calls == [10]
+    assert _exported_student_ids(tasks, result) == list(range(1, LEARNERS + 1))
+    assert _work_files(tasks) == []
+
+
+def test_resume_sweeps_parts_missing_from_the_checkpoint(load_test, tasks, monkeypatch):
+    store_checkpoint = tasks._store_checkpoint  # pylint: disable=protected-access
+    stored = []
+
+    def killed_before_second_checkpoint(*args):
+        if stored:
+            raise RuntimeError("Worker killed")
+        stored.append(args)
+        store_checkpoint(*args)
+
+    monkeypatch.setattr(tasks, '_store_checkpoint', killed_before_second_checkpoint)
+    assert not _export(tasks, load_test, 'task-1').successful()
+    # The checkpoint, the header part and the first batch's part, which the checkpoint doesn't list.
+    assert len(_work_files(tasks)) == 3
+
+    monkeypatch.setattr(tasks, '_store_checkpoint', store_checkpoint)
+    _interrupt_after(monkeypatch, load_test.block_class, 0)
+    assert not _export(tasks, load_test, 'task-2').successful()
+    assert len(_work_files(tasks)) == 2
+
+    monkeypatch.undo()
+    result = _export(tasks, load_test, 'task-3')
+    assert result.successful(), result.result
+    assert _exported_student_ids(tasks, result) == list(range(1, LEARNERS + 1))
+    assert _work_files(tasks) == []
+
+
+def test_csv_export_waits_for_a_pending_export(load_test, tasks, monkeypatch):
+    queued = []
+
+    def delay(*args):
+        queued.append(args)
+        return PendingResult(f"task-{len(queued)}")
+
+    monkeypatch.setattr(tasks.export_csv_data, 'delay', delay)
+    runtime = load_test.get_runtime(-1, user_is_staff=True)
+
+    def csv_export():
+        block = load_test.get_block(runtime, load_test.usage_ids[0])
+        request = Request.blank('/', method='POST', body=b'{}')
+        return json.loads(runtime.handle(block, 'csv_export', request).body)
+
+    assert csv_export()['export_pending'] is True
+    assert csv_export()['export_pending'] is True
+    assert len(queued) == 1
+
+    # An export whose checkpoint went stale was lost, and a new run is queued to resume it.
+    monkeypatch.setattr(tasks, 'CHECKPOINT_STALE_AFTER_S', -1)
+    assert csv_export()['export_pending'] is True
+    assert len(queued) == 2